@@ -1,10 +1,41 @@
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from ..models import Cart, CartItem
+from ..cart_manager import CartManager
 from decimal import Decimal
+import copy
 import uuid
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CachedModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that introspects its model once per class.
+    The unbound fields are built when the subclass is defined and stored as
+    a (name, field) template; each instance receives deep copies, so binding
+    still happens per instance. Only for serializers whose fields don't
+    depend on context.
+    """
+    _field_template = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_template = None
+        if getattr(getattr(cls, 'Meta', None), 'model', None) is not None:
+            cls._field_template = cls()._build_field_template()
+
+    def _build_field_template(self):
+        return tuple(super().get_fields().items())
+
+    def get_fields(self):
+        cls = type(self)
+        if cls._field_template is None:
+            cls._field_template = self._build_field_template()
+        return {name: copy.deepcopy(field) for name, field in cls._field_template}
+
+
+class CartItemSerializer(CachedModelSerializer):
     product_id = serializers.UUIDField()
     total_price = serializers.DecimalField(
         max_digits=12,
@@ -53,7 +84,7 @@ class CartItemSerializer(serializers.ModelSerializer):
         return value
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(CachedModelSerializer):
     items = CartItemSerializer(many=True, required=False)
     subtotal = serializers.DecimalField(
         max_digits=12,
@@ -137,32 +168,46 @@ class CartSerializer(serializers.ModelSerializer):
         # Handle items update if provided
         if items_data is not None:
             self.update_cart_items(instance, items_data)
+            # Annotated totals are stale once items change
+            instance.__dict__.pop('subtotal_db', None)
+            instance.__dict__.pop('item_count_db', None)
         
         return instance
 
     def update_cart_items(self, cart, items_data):
         """Update cart items while maintaining data consistency"""
-        current_items = {str(item.product_id): item for item in cart.items.all()}
+        current_items = {
+            str(product_id): pk
+            for product_id, pk in cart.items.values_list('product_id', 'pk')
+        }
         updated_product_ids = set()
+        to_update = defaultdict(list)
+        to_create = []
+        now = timezone.now()
         
-        # Update or create items
+        # Collect updates (as pk-only instances, grouped by changed fields) and creations
         for item_data in items_data:
             product_id = str(item_data['product_id'])
             if product_id in current_items:
-                # Update existing item
-                item = current_items[product_id]
-                for key, value in item_data.items():
-                    setattr(item, key, value)
-                item.save()
+                fields = {k: v for k, v in item_data.items() if k != 'product_id'}
+                item = CartItem(pk=current_items[product_id], updated_at=now, **fields)
+                to_update[tuple(sorted(fields)) + ('updated_at',)].append(item)
             else:
-                # Create new item
-                CartItem.objects.create(cart=cart, **item_data)
+                to_create.append(CartItem(cart=cart, **item_data))
             updated_product_ids.add(product_id)
         
-        # Remove items not in the update
-        for product_id, item in current_items.items():
-            if product_id not in updated_product_ids:
-                item.delete()
+        with transaction.atomic():
+            for fields, items in to_update.items():
+                CartItem.objects.bulk_update(items, fields=list(fields))
+            if to_create:
+                CartItem.objects.bulk_create(to_create)
+            # Remove items not in the update
+            to_remove = [
+                pk for product_id, pk in current_items.items()
+                if product_id not in updated_product_ids
+            ]
+            if to_remove:
+                CartItem.objects.filter(pk__in=to_remove).delete()
 
 
 class AddToCartSerializer(serializers.Serializer):
@@ -189,7 +234,7 @@ class AddToCartSerializer(serializers.Serializer):
         product_data = {
             'id': product_id,
             'name': "Example Product",
-            'price': "19.99",
+            'price': Decimal("19.99"),
             'sku': "PROD-001",
             'image_url': "https://example.com/product.jpg",
             'category': "Example Category"
@@ -203,45 +248,51 @@ class AddToCartSerializer(serializers.Serializer):
         cart = self.context['cart']
         product_data = validated_data['product_details']
         
-        item, created = CartItem.objects.update_or_create(
-            cart=cart,
-            product_id=validated_data['product_id'],
-            defaults={
-                'product_name': product_data['name'],
-                'price_at_addition': Decimal(product_data['price']),
-                'quantity': validated_data['quantity'],
-                'product_sku': product_data.get('sku', ''),
-                'image_url': product_data.get('image_url', ''),
-                'product_category': product_data.get('category', '')
-            }
+        item = CartManager.add_item(
+            cart,
+            validated_data['product_id'],
+            validated_data['quantity'],
+            product_data
         )
         
-        if not created:
-            item.quantity += validated_data['quantity']
-            item.save()
-        
         return item
 
 
-class CartSummarySerializer(serializers.ModelSerializer):
+class AddToCartResponseSerializer(serializers.Serializer):
     """
-    Lightweight serializer for cart summaries in lists
+    Delta returned after adding an item: the affected item plus the
+    running cart totals, instead of the whole cart
     """
+    cart_id = serializers.UUIDField(read_only=True)
+    item = CartItemSerializer(read_only=True)
     subtotal = serializers.DecimalField(
         max_digits=12,
         decimal_places=2,
         read_only=True
     )
+    total = serializers.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        read_only=True
+    )
     item_count = serializers.IntegerField(read_only=True)
 
-    class Meta:
-        model = Cart
-        fields = [
-            'id',
-            'user_id',
-            'status',
-            'subtotal',
-            'item_count',
-            'currency_code',
-            'updated_at'
-        ]
\ No newline at end of file
+
+class CartSummarySerializer(serializers.Serializer):
+    """
+    Lightweight read-only serializer for cart summaries in lists.
+    Declared explicitly instead of as a ModelSerializer so no model
+    introspection happens per instance; works on `.values()` rows.
+    """
+    id = serializers.UUIDField(read_only=True)
+    user_id = serializers.UUIDField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    subtotal = serializers.DecimalField(
+        source='subtotal_db',
+        max_digits=12,
+        decimal_places=2,
+        read_only=True
+    )
+    item_count = serializers.IntegerField(source='item_count_db', read_only=True)
+    currency_code = serializers.CharField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
@@ -1,54 +1,76 @@
+from django.db.models import Prefetch
 from rest_framework import generics, status
 from rest_framework.response import Response
-from rest_framework.exceptions import ValidationError, NotFound
+from rest_framework.exceptions import ValidationError
 from ..models import Cart, CartItem
 from ..service import ProductService, UserService
 from ..cart_manager import CartManager
 from .serializers import (
     CartSerializer,
     AddToCartSerializer,
+    AddToCartResponseSerializer,
     CartSummarySerializer
 )
 
 
-class CartDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Cart.objects.prefetch_related('items')
+# Services are classes, so the same mapping is shared by every request
+_SERVICE_CONTEXT = {
+    'product_service': ProductService,
+    'user_service': UserService
+}
+
+
+class ServiceContextMixin:
+    """Add the external services to the serializer context"""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(_SERVICE_CONTEXT)
+        return context
+
+
+class CartDetailView(ServiceContextMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = CartManager.with_totals(
+        Cart.objects.prefetch_related(
+            Prefetch(
+                'items',
+                # Only the columns CartItemSerializer reads (plus the FK for prefetch)
+                queryset=CartItem.objects.only(
+                    'id',
+                    'cart',
+                    'product_id',
+                    'product_name',
+                    'product_sku',
+                    'price_at_addition',
+                    'quantity',
+                    'image_url',
+                    'product_category',
+                    'added_at'
+                )
+            )
+        )
+    )
     serializer_class = CartSerializer
 
-    def get_object(self):
-        """Get cart with validation for user/session ownership"""
-        cart = super().get_object()
-        
-        # Check ownership
+    def get_queryset(self):
+        """Limit lookups to carts owned by the current user or session"""
+        queryset = super().get_queryset()
         user = self.request.user if self.request.user.is_authenticated else None
         session_key = self.request.session.session_key
         
         if user:
-            if str(cart.user_id) != str(user.id):
-                raise NotFound("Cart not found")
-        else:
-            if cart.session_key != session_key:
-                raise NotFound("Cart not found")
-        
-        return cart
-
-    def get_serializer_context(self):
-        """Add services to serializer context"""
-        context = super().get_serializer_context()
-        context.update({
-            'request': self.request,
-            'product_service': ProductService,
-            'user_service': UserService
-        })
-        return context
+            return queryset.filter(user_id=user.id)
+        elif session_key:
+            return queryset.filter(session_key=session_key)
+        return queryset.none()
 
     def perform_destroy(self, instance):
         """Convert cart to abandoned status instead of deleting"""
         instance.status = 'abandoned'
-        instance.save()
+        instance.save(update_fields=['status', 'updated_at'])
 
 
-class AddToCartView(generics.CreateAPIView):
+class AddToCartView(ServiceContextMixin, generics.CreateAPIView):
     serializer_class = AddToCartSerializer
 
     def get_cart(self):
@@ -76,45 +98,31 @@ class AddToCartView(generics.CreateAPIView):
         product_id = serializer.validated_data['product_id']
         quantity = serializer.validated_data['quantity']
         
-        # Validate product availability
-        if not ProductService.validate_product_availability(product_id, quantity):
-            raise ValidationError({
-                'product_id': 'Product not available in requested quantity'
-            })
-        
-        # Get product details
+        # Get product details and validate availability from the same lookup
         product_data = ProductService.get_product(product_id)
         if not product_data:
             raise ValidationError({'product_id': 'Product not found'})
+        if product_data.get('stock', 0) < quantity:
+            raise ValidationError({
+                'product_id': 'Product not available in requested quantity'
+            })
         
-        # Create cart item
-        item, created = CartItem.objects.update_or_create(
-            cart=cart,
-            product_id=product_id,
-            defaults={
-                'product_name': product_data['name'],
-                'price_at_addition': product_data['price'],
-                'quantity': quantity,
-                'product_sku': product_data.get('sku', ''),
-                'image_url': product_data.get('image_url', ''),
-                'product_category': product_data.get('category', '')
-            }
-        )
-        
-        if not created:
-            item.quantity += quantity
-            item.save()
+        # Create cart item or increment the existing one
+        item = CartManager.add_item(cart, product_id, quantity, product_data)
         
-        # Return full cart state
-        cart_serializer = CartSerializer(
-            cart,
-            context={
-                'request': request,
-                'product_service': ProductService,
-                'user_service': UserService
-            }
+        # Return the added item and running totals; the full cart is on the detail view
+        cart = CartManager.with_totals().get(pk=cart.pk)
+        response_serializer = AddToCartResponseSerializer(
+            {
+                'cart_id': cart.id,
+                'item': item,
+                'subtotal': cart.subtotal,
+                'total': cart.total,
+                'item_count': cart.item_count
+            },
+            context=self.get_serializer_context()
         )
-        return Response(cart_serializer.data, status=status.HTTP_201_CREATED)
+        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
 class CartListView(generics.ListAPIView):
@@ -128,13 +136,33 @@ class CartListView(generics.ListAPIView):
         if user:
             if not UserService.user_exists(user.id):
                 return Cart.objects.none()
-            return Cart.objects.filter(user_id=user.id)
+            return CartManager.with_totals().filter(user_id=user.id)
         elif session_key:
-            return Cart.objects.filter(session_key=session_key)
+            return CartManager.with_totals().filter(session_key=session_key)
         return Cart.objects.none()
 
+    def list(self, request, *args, **kwargs):
+        """List carts as plain rows with totals computed by the database"""
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            'id',
+            'user_id',
+            'status',
+            'currency_code',
+            'updated_at',
+            'subtotal_db',
+            'item_count_db'
+        )
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
 
-class MergeCartsView(generics.GenericAPIView):
+class MergeCartsView(ServiceContextMixin, generics.GenericAPIView):
     """View for merging session cart with user cart after login"""
     
     def post(self, request, *args, **kwargs):
@@ -161,10 +189,6 @@ class MergeCartsView(generics.GenericAPIView):
         # Return merged cart
         serializer = CartSerializer(
             user_cart,
-            context={
-                'request': request,
-                'product_service': ProductService,
-                'user_service': UserService
-            }
+            context=self.get_serializer_context()
         )
         return Response(serializer.data)
\ No newline at end of file
@@ -1,3 +1,8 @@
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from .models import Cart, CartItem
 
 
@@ -6,6 +11,20 @@ class CartManager:
     Handles cart-related database operations
     """
     
+    @staticmethod
+    def with_totals(queryset=None):
+        """Annotate carts with subtotal_db and item_count_db computed in SQL"""
+        if queryset is None:
+            queryset = Cart.objects.all()
+        return queryset.annotate(
+            subtotal_db=Coalesce(
+                Sum(F('items__quantity') * F('items__price_at_addition')),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+            item_count_db=Coalesce(Sum('items__quantity'), 0)
+        )
+
     @staticmethod
     def get_user_cart(user_id):
         cart, created = Cart.objects.get_or_create(
@@ -24,14 +43,70 @@ class CartManager:
         )
         return cart
 
+    @staticmethod
+    def add_item(cart, product_id, quantity, product_data):
+        """
+        Add quantity of a product to the cart, incrementing in SQL when the
+        item already exists so concurrent adds don't lose updates
+        """
+        snapshot = {
+            'product_name': product_data['name'],
+            'price_at_addition': product_data['price'],
+            'product_sku': product_data.get('sku', ''),
+            'image_url': product_data.get('image_url', ''),
+            'product_category': product_data.get('category', '')
+        }
+        items = CartItem.objects.filter(cart=cart, product_id=product_id)
+        with transaction.atomic():
+            CartManager.lock_cart(cart)
+            updated = items.update(
+                quantity=F('quantity') + quantity,
+                updated_at=timezone.now(),
+                **snapshot
+            )
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        return CartItem.objects.create(
+                            cart=cart,
+                            product_id=product_id,
+                            quantity=quantity,
+                            **snapshot
+                        )
+                except IntegrityError:
+                    # A concurrent request may have created the item first;
+                    # if there is still no row, the error was something else
+                    updated = items.update(
+                        quantity=F('quantity') + quantity,
+                        updated_at=timezone.now(),
+                        **snapshot
+                    )
+                    if not updated:
+                        raise
+            return items.get()
+
+    @staticmethod
+    def lock_cart(cart):
+        """Lock the cart row for the current transaction (serializes item writes)"""
+        Cart.objects.select_for_update().only('pk').get(pk=cart.pk)
+
     @staticmethod
     def merge_carts(user_cart, session_cart):
-        for item in session_cart.items.all():
-            try:
-                user_item = user_cart.items.get(product_id=item.product_id)
-                user_item.quantity += item.quantity
-                user_item.save()
-            except CartItem.DoesNotExist:
-                item.cart = user_cart
-                item.save()
-        session_cart.delete()
\ No newline at end of file
+        now = timezone.now()
+        with transaction.atomic():
+            CartManager.lock_cart(user_cart)
+            session_items = {
+                item.product_id: item for item in session_cart.items.all()
+            }
+            to_update = list(user_cart.items.filter(product_id__in=list(session_items)))
+            for user_item in to_update:
+                user_item.quantity += session_items.pop(user_item.product_id).quantity
+                user_item.updated_at = now
+            if to_update:
+                CartItem.objects.bulk_update(to_update, fields=['quantity', 'updated_at'])
+            # Reparent the rest in place so they keep their pk and added_at
+            if session_items:
+                CartItem.objects.filter(
+                    pk__in=[item.pk for item in session_items.values()]
+                ).update(cart=user_cart, updated_at=now)
+            session_cart.delete()
@@ -1,4 +1,5 @@
 import uuid
+from decimal import Decimal
 from django.db import models
 from django.core.validators import MinValueValidator
 
@@ -31,19 +32,19 @@ class Cart(models.Model):
     shipping_cost = models.DecimalField(
         max_digits=12,  # Increased for high-value items
         decimal_places=2,
-        default=0.00,
+        default=Decimal('0.00'),
         validators=[MinValueValidator(0)]
     )
     discount_amount = models.DecimalField(
         max_digits=12,
         decimal_places=2,
-        default=0.00,
+        default=Decimal('0.00'),
         validators=[MinValueValidator(0)]
     )
     tax_amount = models.DecimalField(
         max_digits=12,
         decimal_places=2,
-        default=0.00,
+        default=Decimal('0.00'),
         validators=[MinValueValidator(0)]
     )
     
@@ -77,51 +78,64 @@ class Cart(models.Model):
     @property
     def subtotal(self):
         """Sum of all cart items before adjustments"""
-        return sum(item.total_price for item in self.items.all())
+        if hasattr(self, 'subtotal_db'):
+            return self.subtotal_db.quantize(Decimal('0.01'))
+        subtotal = self.items.aggregate(
+            total=models.Sum(
+                models.F('quantity') * models.F('price_at_addition'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            )
+        )['total'] or Decimal('0')
+        return subtotal.quantize(Decimal('0.01'))
     
     @property
     def total(self):
         """Final total including all adjustments"""
         total = self.subtotal + self.tax_amount + self.shipping_cost - self.discount_amount
-        return max(0, total)  # Ensure never negative
+        return max(Decimal('0.00'), total)  # Ensure never negative
     
     @property
     def item_count(self):
         """Total quantity of items in cart"""
+        if hasattr(self, 'item_count_db'):
+            return self.item_count_db
         return self.items.aggregate(total=models.Sum('quantity'))['total'] or 0
     
     def clear(self):
         """Remove all items from cart"""
-        self.items.all().delete()
-        self.refresh_pricing()
+        deleted, _ = self.items.all().delete()
+        if deleted:
+            self.refresh_pricing()
     
     def refresh_pricing(self):
         """Recalculate all pricing fields (would call external services)"""
         # Placeholder for actual implementation
-        self.shipping_cost = 0  # Would call shipping service
-        self.tax_amount = 0     # Would call tax service
-        self.save()
+        self.shipping_cost = Decimal('0.00')  # Would call shipping service
+        self.tax_amount = Decimal('0.00')     # Would call tax service
+        self.save(update_fields=['shipping_cost', 'tax_amount', 'updated_at'])
     
     def convert_to_order(self, order_service_client):
         """Convert cart to order in external order service"""
+        rows = self.items.values_list('product_id', 'quantity', 'price_at_addition')
         order_data = {
             'cart_id': str(self.id),
             'user_id': str(self.user_id) if self.user_id else None,
             'items': [
                 {
-                    'product_id': str(item.product_id),
-                    'quantity': item.quantity,
-                    'unit_price': float(item.price_at_addition),
+                    'product_id': str(product_id),
+                    'quantity': quantity,
+                    'unit_price': str(price),
                     'currency': self.currency_code
                 }
-                for item in self.items.all()
+                for product_id, quantity, price in rows
             ],
+            # Money is sent as decimal strings so no precision is lost
             'totals': {
-                'subtotal': float(self.subtotal),
-                'shipping': float(self.shipping_cost),
-                'tax': float(self.tax_amount),
-                'discount': float(self.discount_amount),
-                'total': float(self.total)
+                'subtotal': str(self.subtotal),
+                'shipping': str(self.shipping_cost),
+                'tax': str(self.tax_amount),
+                'discount': str(self.discount_amount),
+                'total': str(self.total)
             }
         }
         
@@ -129,7 +143,7 @@ class Cart(models.Model):
         response = order_service_client.create_order(order_data)
         if response.success:
             self.status = 'converted'
-            self.save()
+            self.save(update_fields=['status', 'updated_at'])
             return True
         return False
 
@@ -181,10 +195,14 @@ class CartItem(models.Model):
     def total_price(self):
         return self.quantity * self.price_at_addition
     
-    def update_quantity(self, new_quantity):
-        """Update quantity with validation"""
+    def update_quantity(self, new_quantity, skip_refresh=False):
+        """
+        Update quantity with validation. Pass skip_refresh=True when updating
+        several items and call cart.refresh_pricing() once afterwards.
+        """
         if new_quantity < 1:
             raise ValueError("Quantity must be at least 1")
         self.quantity = new_quantity
-        self.save()
-        self.cart.refresh_pricing()
\ No newline at end of file
+        self.save(update_fields=['quantity', 'updated_at'])
+        if not skip_refresh:
+            self.cart.refresh_pricing()
\ No newline at end of file
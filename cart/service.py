@@ -1,19 +1,34 @@
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from decimal import Decimal
+import orjson
 import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, Timeout
-from functools import lru_cache
 from tenacity import retry, stop_after_attempt, wait_exponential
 from django.conf import settings
+from django.core.cache import cache
+
+# Shared keep-alive connection pool; retries are handled by tenacity
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=0)
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
+
 
 class BaseService:
     API_TIMEOUT = 3  # seconds
     MAX_RETRIES = 3
     
     @classmethod
-    def _make_request(cls, url):
+    def _make_request(cls, url, method='GET', **kwargs):
         try:
-            response = requests.get(
+            response = _session.request(
+                method,
                 url,
-                timeout=cls.API_TIMEOUT
+                timeout=cls.API_TIMEOUT,
+                **kwargs
             )
             response.raise_for_status()  # Raises HTTPError for bad responses
             return response
@@ -24,17 +39,172 @@ class BaseService:
             print(f"Error making request to {url}: {str(e)}")
             return None
 
+    @classmethod
+    def _request_json(cls, url, method='GET', **kwargs):
+        response = cls._make_request(url, method=method, **kwargs)
+        if response is None:
+            return None
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            print(f"Invalid JSON from {url}: {str(e)}")
+            return None
+
 class ProductService(BaseService):
     BASE_URL = getattr(settings, 'PRODUCT_SERVICE_URL', 'http://localhost:7000')
-    
+    CACHE_TTL = 60  # seconds
+    CACHE_MAXSIZE = 1024
+    SHARED_CACHE_PREFIX = 'product:'
+    # Longest a lookup can take: every attempt timing out plus the
+    # maximum tenacity backoff between attempts
+    FETCH_WAIT_TIMEOUT = (
+        BaseService.API_TIMEOUT * BaseService.MAX_RETRIES
+        + 10 * (BaseService.MAX_RETRIES - 1)
+    )
+
+    # Per-process L1 in front of the shared django cache (Redis in production).
+    # Shared by all threads in the worker; failed lookups are never cached
+    _cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+    _cache_lock = threading.Lock()
+    # Futures for lookups in progress, removed as soon as the lookup finishes
+    _in_flight = {}
+
+    @staticmethod
+    def get_product(product_id):
+        return ProductService.get_products([product_id]).get(product_id)
+
+    @staticmethod
+    def get_products(product_ids):
+        """
+        Look up several products with at most one upstream request.
+        Returns a dict keyed by the given ids; unknown products are omitted.
+        """
+        keys = {product_id: str(product_id) for product_id in product_ids}
+        found = {}
+        owned = {}
+        waiting = {}
+        with ProductService._cache_lock:
+            for key in set(keys.values()):
+                product = ProductService._cache.get(key)
+                if product is not None:
+                    found[key] = product
+                elif key in ProductService._in_flight:
+                    waiting[key] = ProductService._in_flight[key]
+                else:
+                    owned[key] = ProductService._in_flight[key] = Future()
+
+        # Only one thread fetches a given product; the rest wait on its future,
+        # which is resolved with the outcome (None on failure) either way
+        if owned:
+            fetched = {}
+            error = None
+            try:
+                fetched = ProductService._get_shared(list(owned))
+                remaining = [key for key in owned if key not in fetched]
+                if remaining:
+                    fresh = ProductService._fetch_products(remaining)
+                    ProductService._set_shared(fresh)
+                    fetched.update(fresh)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Always resolve and drop our futures, whatever interrupted the fetch
+                with ProductService._cache_lock:
+                    if error is None:
+                        for key, product in fetched.items():
+                            ProductService._cache[key] = product
+                    for key, future in owned.items():
+                        del ProductService._in_flight[key]
+                        if isinstance(error, Exception):
+                            future.set_exception(error)
+                        else:
+                            future.set_result(fetched.get(key))
+            found.update(fetched)
+
+        for key, future in waiting.items():
+            try:
+                product = future.result(timeout=ProductService.FETCH_WAIT_TIMEOUT)
+            except FutureTimeoutError:
+                print(f"Timed out waiting for product {key} lookup")
+                continue
+            if product is not None:
+                found[key] = product
+
+        return {
+            product_id: found[key]
+            for product_id, key in keys.items()
+            if key in found
+        }
+
+    @staticmethod
+    def _get_shared(keys):
+        """Read products from the shared (Redis) cache; errors count as misses"""
+        names = {f"{ProductService.SHARED_CACHE_PREFIX}{key}": key for key in keys}
+        try:
+            cached = cache.get_many(list(names))
+        except Exception as e:
+            print(f"Error reading products from shared cache: {str(e)}")
+            return {}
+        products = {}
+        bad = []
+        for name, value in cached.items():
+            try:
+                products[names[name]] = ProductService._parse_product(orjson.loads(value))
+            except Exception as e:
+                print(f"Discarding unreadable shared cache entry {name}: {str(e)}")
+                bad.append(name)
+        if bad:
+            try:
+                cache.delete_many(bad)
+            except Exception as e:
+                print(f"Error deleting products from shared cache: {str(e)}")
+        return products
+
+    @staticmethod
+    def _set_shared(products):
+        """Store products in the shared cache as orjson bytes"""
+        if not products:
+            return
+        try:
+            cache.set_many(
+                {
+                    f"{ProductService.SHARED_CACHE_PREFIX}{key}": orjson.dumps(product, default=str)
+                    for key, product in products.items()
+                },
+                timeout=ProductService.CACHE_TTL
+            )
+        except Exception as e:
+            print(f"Error writing products to shared cache: {str(e)}")
+
+    @staticmethod
+    def _parse_product(product):
+        if product.get('price') is not None:
+            product['price'] = Decimal(str(product['price']))
+        return product
+
     @staticmethod
     @retry(stop=stop_after_attempt(BaseService.MAX_RETRIES),
           wait=wait_exponential(multiplier=1, min=2, max=10))
-    @lru_cache(maxsize=128)
-    def get_product(product_id):
-        url = f"{ProductService.BASE_URL}/product/{product_id}"
-        response = ProductService._make_request(url)
-        return response.json() if response else None
+    def _fetch_products(product_ids):
+        """
+        POST {"ids": [...]} to the batch endpoint, which answers with a
+        JSON list of product objects (each carrying its "id"). The contract
+        requires "price" to be a JSON string; it is parsed to Decimal here
+        once, so cached products carry an exact Decimal price.
+        """
+        url = f"{ProductService.BASE_URL}/products/batch"
+        products = ProductService._request_json(
+            url,
+            method='POST',
+            json={'ids': list(product_ids)}
+        )
+        if not products:
+            return {}
+        return {
+            str(product['id']): ProductService._parse_product(product)
+            for product in products
+        }
 
     @staticmethod
     def validate_product_availability(product_id, quantity):
@@ -1,3 +1,258 @@
-from django.test import TestCase
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .cart_manager import CartManager
+from .models import Cart, CartItem
+from .service import ProductService
+
+
+def make_product(product_id, price='2.50', stock=10):
+    return {
+        'id': str(product_id),
+        'name': 'Example Product',
+        'price': Decimal(price),
+        'stock': stock,
+        'sku': 'PROD-001',
+    }
+
+
+class AddItemTests(TestCase):
+    def setUp(self):
+        self.cart = Cart.objects.create(session_key='session-a1')
+        self.product_id = uuid.uuid4()
+
+    def test_creates_item(self):
+        item = CartManager.add_item(self.cart, self.product_id, 2, make_product(self.product_id))
+        self.assertEqual(item.quantity, 2)
+        self.assertEqual(item.price_at_addition, Decimal('2.50'))
+
+    def test_increments_existing_item(self):
+        CartManager.add_item(self.cart, self.product_id, 2, make_product(self.product_id))
+        item = CartManager.add_item(self.cart, self.product_id, 3, make_product(self.product_id))
+        self.assertEqual(item.quantity, 5)
+        self.assertEqual(self.cart.items.count(), 1)
+
+    def test_refreshes_snapshot_on_increment(self):
+        CartManager.add_item(self.cart, self.product_id, 1, make_product(self.product_id))
+        item = CartManager.add_item(
+            self.cart, self.product_id, 1, make_product(self.product_id, price='3.00')
+        )
+        self.assertEqual(item.price_at_addition, Decimal('3.00'))
+
+    def test_concurrent_create_falls_back_to_increment(self):
+        product_data = make_product(self.product_id)
+        # Another request's row, committed after our first UPDATE matched nothing
+        CartItem.objects.create(
+            cart=self.cart,
+            product_id=self.product_id,
+            product_name='Example Product',
+            price_at_addition=Decimal('2.50'),
+            quantity=2
+        )
+        original_update = QuerySet.update
+        calls = []
+
+        def update_missing_first(queryset, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                return 0
+            return original_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', update_missing_first):
+            item = CartManager.add_item(self.cart, self.product_id, 2, product_data)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(item.quantity, 4)
+
+    def test_other_integrity_errors_are_raised(self):
+        product_data = make_product(self.product_id)
+        product_data['price'] = None
+        with self.assertRaises(IntegrityError):
+            CartManager.add_item(self.cart, self.product_id, 1, product_data)
+        self.assertFalse(self.cart.items.exists())
+
+
+class AddToCartViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('api_v1:add-to-cart')
+        self.product_id = uuid.uuid4()
+        patcher = mock.patch(
+            'cart.api_v1.views.ProductService.get_product',
+            side_effect=make_product
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add(self, quantity):
+        return self.client.post(
+            self.url,
+            {'product_id': str(self.product_id), 'quantity': quantity},
+            format='json'
+        )
+
+    def test_adding_twice_sums_quantities(self):
+        self.assertEqual(self.add(2).status_code, 201)
+        response = self.add(3)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['item']['quantity'], 5)
+        self.assertEqual(response.data['item_count'], 5)
+        self.assertEqual(response.data['subtotal'], '12.50')
+
+    def test_rejects_quantity_above_stock(self):
+        response = self.add(11)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CartItem.objects.exists())
+
+
+class MergeCartsTests(TestCase):
+    def setUp(self):
+        self.user_cart = Cart.objects.create(user_id=uuid.uuid4())
+        self.session_cart = Cart.objects.create(session_key='session-a1')
+        self.shared_id = uuid.uuid4()
+        self.moved_id = uuid.uuid4()
+        self.user_item = self.make_item(self.user_cart, self.shared_id, 3)
+        self.make_item(self.session_cart, self.shared_id, 2)
+        self.moved_item = self.make_item(self.session_cart, self.moved_id, 5)
+        self.earlier = timezone.now() - timedelta(days=1)
+        CartItem.objects.update(added_at=self.earlier, updated_at=self.earlier)
+
+    def make_item(self, cart, product_id, quantity):
+        return CartItem.objects.create(
+            cart=cart,
+            product_id=product_id,
+            product_name='Example Product',
+            price_at_addition=Decimal('2.50'),
+            quantity=quantity
+        )
+
+    def test_sums_shared_products_and_moves_the_rest(self):
+        CartManager.merge_carts(self.user_cart, self.session_cart)
+        quantities = dict(self.user_cart.items.values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {self.shared_id: 5, self.moved_id: 5})
+        self.assertFalse(Cart.objects.filter(pk=self.session_cart.pk).exists())
+
+    def test_keeps_identity_and_timestamps(self):
+        CartManager.merge_carts(self.user_cart, self.session_cart)
+        shared = CartItem.objects.get(product_id=self.shared_id)
+        moved = CartItem.objects.get(product_id=self.moved_id)
+        self.assertEqual(shared.pk, self.user_item.pk)
+        self.assertEqual(moved.pk, self.moved_item.pk)
+        self.assertEqual(moved.added_at, self.earlier)
+        self.assertEqual(shared.added_at, self.earlier)
+        self.assertGreater(shared.updated_at, self.earlier)
+        self.assertGreater(moved.updated_at, self.earlier)
+
+
+class ProductServiceSingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        ProductService._cache.clear()
+        self.calls = []
+        self.release = threading.Event()
+
+    def fetch(self, result):
+        def fake_fetch(product_ids):
+            self.calls.append(list(product_ids))
+            self.release.wait(timeout=5)
+            if isinstance(result, BaseException):
+                raise result
+            return {key: make_product(key) for key in product_ids} if result else {}
+        return fake_fetch
+
+    def run_concurrently(self, fake_fetch, count=5):
+        results = []
+        errors = []
+
+        def lookup():
+            try:
+                results.append(ProductService.get_product('p1'))
+            except Exception as e:
+                errors.append(e)
+
+        with mock.patch.object(ProductService, '_fetch_products', side_effect=fake_fetch):
+            threads = [threading.Thread(target=lookup) for _ in range(count)]
+            threads[0].start()
+            while 'p1' not in ProductService._in_flight:
+                time.sleep(0.01)
+            for thread in threads[1:]:
+                thread.start()
+            time.sleep(0.1)
+            self.release.set()
+            for thread in threads:
+                thread.join(timeout=5)
+        return results, errors
+
+    def test_waiters_share_one_fetch(self):
+        results, errors = self.run_concurrently(self.fetch(True))
+        self.assertEqual(self.calls, [['p1']])
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result['id'] == 'p1' for result in results))
+        self.assertEqual(ProductService._in_flight, {})
+
+    def test_failed_fetch_reaches_waiters(self):
+        results, errors = self.run_concurrently(self.fetch(False))
+        self.assertEqual(self.calls, [['p1']])
+        self.assertEqual(results, [None] * 5)
+        self.assertEqual(ProductService._in_flight, {})
+        self.assertNotIn('p1', ProductService._cache)
+
+    def test_exception_reaches_waiters(self):
+        results, errors = self.run_concurrently(self.fetch(RuntimeError('upstream down')))
+        self.assertEqual(self.calls, [['p1']])
+        self.assertEqual(len(errors), 5)
+        self.assertEqual(ProductService._in_flight, {})
+
+    def test_successful_lookup_is_cached(self):
+        self.release.set()
+        with mock.patch.object(ProductService, '_fetch_products', side_effect=self.fetch(True)):
+            ProductService.get_product('p1')
+            ProductService.get_product('p1')
+        self.assertEqual(self.calls, [['p1']])
+
+
+class CartDetailOwnershipTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.session_key = self.client.session.session_key
+        self.session_cart = Cart.objects.create(session_key=self.session_key)
+        self.user = User.objects.create_user('shopper')
+        self.user_cart = Cart.objects.create(user_id=uuid.UUID(int=self.user.id))
+
+    def detail(self, client, cart):
+        return client.get(reverse('api_v1:cart-detail', kwargs={'pk': cart.pk}))
+
+    def test_session_owner_can_read_cart(self):
+        self.assertEqual(self.detail(self.client, self.session_cart).status_code, 200)
+
+    def test_other_session_gets_404(self):
+        other = APIClient()
+        other.session.save()
+        self.assertEqual(self.detail(other, self.session_cart).status_code, 404)
+
+    def test_request_without_session_gets_404(self):
+        self.assertEqual(self.detail(APIClient(), self.session_cart).status_code, 404)
+        self.assertEqual(self.detail(APIClient(), self.user_cart).status_code, 404)
+
+    def test_user_owner_can_read_cart(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(self.detail(client, self.user_cart).status_code, 200)
+
+    def test_other_user_gets_404(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('someone-else'))
+        self.assertEqual(self.detail(client, self.user_cart).status_code, 404)
+        self.assertEqual(self.detail(client, self.session_cart).status_code, 404)